@@ -1,8 +1,44 @@
 import streamlit as st
-from openai import OpenAI
+from openai import AsyncOpenAI
 import os
-import math
+import asyncio
+import io
+import json
+import re
+import threading
+import numpy as np
+import orjson
 import html
+import bisect
+from collections import defaultdict
+
+@st.cache_resource(show_spinner=False)
+def _get_event_loop():
+    """Start one background asyncio event loop shared by all sessions"""
+    # The cached client's connection pool belongs to the loop it was first used on,
+    # so every request runs on this long-lived loop rather than a fresh asyncio.run()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coro):
+    """Run a coroutine on the shared event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+@st.cache_resource(show_spinner=False)
+def _get_request_semaphore():
+    """Create one semaphore bounding fanned-out requests across all sessions"""
+    # Every session shares the loop, client and API key, so the limit has to be shared too;
+    # it's created on the shared loop, which is the only loop that ever awaits it
+    async def create():
+        return asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return run_async(create())
+
+@st.cache_resource(show_spinner=False)
+def _create_openai_client(api_key):
+    """Create one OpenAI client per API key, reused across reruns to keep connections alive"""
+    # The SDK retries rate-limit (429), timeout and 5xx errors with exponential backoff
+    return AsyncOpenAI(api_key=api_key, max_retries=MAX_RETRIES)
 
 # For Streamlit Cloud deployment
 def get_openai_client():
@@ -17,32 +53,47 @@ def get_openai_client():
     if not api_key:
         return None
     
-    return OpenAI(api_key=api_key)
+    return _create_openai_client(api_key)
+
+# Precompiled pattern for splitting responses into words
+_WORD_RE = re.compile(r'\S+')
+
+# Confidence color bands shared by labels and badges (see README):
+# <60% pink, 60-74% red, 75-89% orange, >=90% green
+_CONFIDENCE_THRESHOLDS = [60, 75, 90]
+_CONFIDENCE_COLORS = ["#ff2d92", "#ff3b30", "#ff9500", "#34c759"]  # Apple pink, red, orange, green
+_CONFIDENCE_COLOR_ARRAY = np.array(_CONFIDENCE_COLORS)
 
-# Initialize client
-client = get_openai_client()
+# Completion settings
+MODEL = "gpt-4o-mini"
+MAX_TOKENS = 150
+TEMPERATURE = 0.7
+
+# Concurrency and retry limits for fanned-out requests; the concurrency limit is shared by
+# all sessions in the process, so keep it within the account's rate limits
+MAX_CONCURRENT_REQUESTS = 8
+MAX_RETRIES = 3
+
+# Keep only the most recent chat entries in session state
+MAX_HISTORY = 50
+
+# Re-render the streaming response every N chunks to limit Streamlit rerender overhead
+STREAM_RENDER_INTERVAL = 5
 
 def get_confidence_color(confidence_percentage):
     """Return color based on confidence percentage"""
-    if confidence_percentage >= 90:
-        return "green"
-    elif confidence_percentage >= 75:
-        return "orange"
-    elif confidence_percentage >= 60:
-        return "#FF8C00"  # Dark orange
-    else:
-        return "red"
+    return _CONFIDENCE_COLORS[bisect.bisect_right(_CONFIDENCE_THRESHOLDS, confidence_percentage)]
+
+def get_confidence_colors(confidence_percentages):
+    """Return the color for each of an array of confidence percentages"""
+    # Vectorized equivalent of get_confidence_color (side='right' matches bisect_right)
+    return _CONFIDENCE_COLOR_ARRAY[np.searchsorted(_CONFIDENCE_THRESHOLDS, confidence_percentages, side='right')]
 
 def format_confidence_label(confidence_percentage):
     """Format confidence as a colored label with Apple-inspired design"""
-    if confidence_percentage >= 80:
-        color = "#34c759"  # Apple green
-    elif confidence_percentage >= 70:
-        color = "#ff9500"  # Apple orange
-    elif confidence_percentage >= 40:
-        color = "#ff3b30"  # Apple red
-    else:
-        color = "#ff2d92"  # Apple pink
+    # Color the value as displayed (one decimal place) so label text and color agree
+    confidence_percentage = round(confidence_percentage, 1)
+    color = get_confidence_color(confidence_percentage)
 
     return f"""
     <div style="
@@ -59,365 +110,691 @@ def format_confidence_label(confidence_percentage):
     </div>
     """
 
-def get_chatbot_response(user_question):
-    """Get response from OpenAI with logprobs"""
+def _completion_params(prompt, model=MODEL, max_tokens=MAX_TOKENS, temperature=TEMPERATURE):
+    """Build the chat completion request body for a single prompt"""
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        # Only the chosen token's logprob is used, so no top_logprobs alternatives are requested
+        "logprobs": True
+    }
+
+def _parse_completion(body):
+    """Return (text, token_logprobs) from a chat completion response parsed as plain JSON"""
+    choice = body["choices"][0]
+    content = (choice.get("logprobs") or {}).get("content") or []
+    return (choice["message"].get("content") or "").strip(), [token["logprob"] for token in content]
+
+async def _acomplete(client, prompt, model=MODEL, max_tokens=MAX_TOKENS, temperature=TEMPERATURE):
+    """Request a chat completion for a single prompt and return (text, token_logprobs)"""
+    # Read the raw JSON rather than letting the SDK build a model object for every token
+    raw = await client.chat.completions.with_raw_response.create(
+        **_completion_params(prompt, model=model, max_tokens=max_tokens, temperature=temperature)
+    )
+    return _parse_completion(orjson.loads(raw.content))
+
+async def _acreate_completions(client, prompts, semaphore, temperature=TEMPERATURE):
+    """Request chat completions for several prompts concurrently, in prompt order, with failed requests returned as their exception"""
+    async def complete(prompt):
+        async with semaphore:
+            return await _acomplete(client, prompt, temperature=temperature)
+    
+    # One failed request must not discard the answers that did come back
+    return await asyncio.gather(*(complete(prompt) for prompt in prompts), return_exceptions=True)
+
+def _token_logprobs(logprobs):
+    """Return the logprob of each chosen token from a choice's logprobs"""
+    if not logprobs or not logprobs.content:
+        return []
+    return [token.logprob for token in logprobs.content]
+
+async def _astream_completion(client, prompt):
+    """Yield (text, token_logprobs) for each streamed chunk of a chat completion"""
+    response = await client.chat.completions.create(**_completion_params(prompt), stream=True)
+    
+    # Each chunk carries its text delta and the logprobs of the tokens in it
+    async for chunk in response:
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        yield choice.delta.content or "", _token_logprobs(choice.logprobs)
+
+def stream_chatbot_response(user_question):
+    """Stream response text and per-token logprobs from OpenAI as they arrive; API errors are raised to the caller"""
+    client = get_openai_client()
+    if not client:
+        st.error("OpenAI API key not configured. Please set it in Streamlit secrets or environment variables.")
+        return
+    
+    # Pull chunks from the event loop one at a time so rendering stays on the script thread
+    stream = _astream_completion(client, user_question)
+    try:
+        while True:
+            try:
+                chunk = run_async(stream.__anext__())
+            except StopAsyncIteration:
+                break
+            yield chunk
+    finally:
+        run_async(stream.aclose())
+
+def get_chatbot_responses(user_questions, temperature=TEMPERATURE):
+    """Get (text, logprobs) responses, or the exception raised, for several questions from concurrent OpenAI requests"""
+    client = get_openai_client()
+    if not client:
+        st.error("OpenAI API key not configured. Please set it in Streamlit secrets or environment variables.")
+        return []
+    
+    try:
+        return run_async(_acreate_completions(
+            client, user_questions, _get_request_semaphore(), temperature=temperature
+        ))
+    except Exception as e:
+        return [e] * len(user_questions)
+
+@st.cache_data(max_entries=512, ttl=24 * 60 * 60, show_spinner=False)
+def _cached_completion(prompt, model, max_tokens, temperature):
+    """Call OpenAI once per distinct prompt and settings; repeats are served from cache"""
+    # Plain text and floats serialize cleanly into the cache
+    return run_async(_acomplete(
+        get_openai_client(), prompt, model=model, max_tokens=max_tokens, temperature=temperature
+    ))
+
+def get_cached_chatbot_response(user_question):
+    """Get a deterministic (temperature 0) response, reusing earlier answers to the same question"""
+    client = get_openai_client()
     if not client:
         st.error("OpenAI API key not configured. Please set it in Streamlit secrets or environment variables.")
         return None, None
     
     try:
-        response = client.completions.create(
-            model="gpt-3.5-turbo-instruct",
-            prompt=user_question,
-            max_tokens=150,
-            temperature=0.7,
-            logprobs=5,  # Get top 5 logprobs for each token
-            echo=False
-        )
-        
-        # Extract the response text and logprobs
-        response_text = response.choices[0].text.strip()
-        logprobs = response.choices[0].logprobs.top_logprobs
-        
-        return response_text, logprobs
+        return _cached_completion(user_question, MODEL, MAX_TOKENS, 0.0)
     except Exception as e:
         st.error(f"Error calling OpenAI API: {str(e)}")
         return None, None
 
-def calculate_token_confidences(response_text, logprobs):
-    """Calculate confidence for each token"""
-    if not logprobs:
-        return [], 0.0
-    
-    token_confidences = []
-    total_confidence = 0.0
-    token_count = 0
-    
-    # Process each token's logprobs
-    for i, token_logprobs in enumerate(logprobs):
-        if token_logprobs:
-            # Get the highest logprob (most likely token)
-            max_logprob = max(token_logprobs.values())
-            confidence = math.exp(max_logprob) * 100
-            token_confidences.append(confidence)
-            total_confidence += confidence
-            token_count += 1
+def submit_batch(questions, temperature=TEMPERATURE):
+    """Submit questions to OpenAI's Batch API and return the batch id"""
+    client = get_openai_client()
+    if not client:
+        st.error("OpenAI API key not configured. Please set it in Streamlit secrets or environment variables.")
+        return None
     
-    # Calculate overall confidence
-    overall_confidence = total_confidence / token_count if token_count > 0 else 0.0
+    # One request per line, matched back to its question by custom_id
+    lines = [
+        json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": _completion_params(question, temperature=temperature)
+        })
+        for i, question in enumerate(questions)
+    ]
     
-    return token_confidences, overall_confidence
+    try:
+        batch_file = run_async(client.files.create(
+            file=("questions.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))),
+            purpose="batch"
+        ))
+        batch = run_async(client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        ))
+        return batch.id
+    except Exception as e:
+        st.error(f"Error submitting batch to OpenAI API: {str(e)}")
+        return None
 
-def split_response_into_tokens(response_text):
-    """Split response text into tokens (simplified tokenization)"""
-    # This is a simplified tokenization - in practice, you'd want to use the actual tokens
-    # For now, we'll split by whitespace and punctuation
-    import re
-    tokens = re.findall(r'\S+|\s+', response_text)
-    return [token for token in tokens if token.strip()]
-
-def split_response_into_sentences(text):
-    import re
-    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-    return [s for s in sentences if s]
-
-def group_token_confidences_by_sentence(response_text, tokens, confidences):
-    import re
-    sentences = split_response_into_sentences(response_text)
-    sentence_confidences = []
-
-    token_index = 0
-    for sentence in sentences:
-        sentence_token_count = len(re.findall(r'\S+', sentence))
-        sentence_conf = confidences[token_index:token_index + sentence_token_count]
-        avg_conf = sum(sentence_conf) / len(sentence_conf) if sentence_conf else 0
-        sentence_confidences.append((sentence, avg_conf))
-        token_index += sentence_token_count
-
-    return sentence_confidences
+def _batch_error_message(record):
+    """Return the error message of a failed Batch API result line"""
+    response = record.get("response") or {}
+    error = record.get("error") or (response.get("body") or {}).get("error") or {}
+    return error.get("message") or f"request failed with status {response.get('status_code')}"
 
-def main():
-    st.set_page_config(
-        page_title="Interpretable Chatbot",
-        page_icon="🤖",
-        layout="wide"
-    )
-    
-    # Apply Apple-inspired custom CSS
-    st.markdown("""
-    <style>
-    /* Apple-inspired design system */
-    .main {
-        background-color: #fafafa;
-    }
-    
-    .stApp {
-        background-color: #fafafa;
-    }
+def poll_batch(batch_id):
+    """Return a batch's status and, once completed, its {index: (text, logprobs)} results and {index: error} failures"""
+    client = get_openai_client()
+    batch = run_async(client.batches.retrieve(batch_id))
+    if batch.status != "completed":
+        return batch.status, None, None
     
-    /* Custom title styling */
-    .main-title {
-        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-        font-size: 2.5rem;
-        font-weight: 600;
-        color: #1d1d1f;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        letter-spacing: -0.02em;
-    }
-    
-    .main-subtitle {
-        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-        font-size: 1.1rem;
-        color: #86868b;
-        text-align: center;
-        margin-bottom: 2rem;
-        font-weight: 400;
-    }
+    results = {}
+    errors = {}
+    # Failed requests can show up in the output file with an error status as well as in the error file
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        output = run_async(client.files.content(file_id))
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                results[int(record["custom_id"])] = _parse_completion(response["body"])
+            else:
+                errors[int(record["custom_id"])] = _batch_error_message(record)
     
-    /* Card-like containers */
-    .chat-container {
-        background: white;
-        border-radius: 16px;
-        padding: 24px;
-        margin: 16px 0;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.04);
-        border: 1px solid #e5e5e7;
-    }
+    return batch.status, results, errors
+
+def calculate_token_confidences(logprobs):
+    """Calculate confidence for each token as a float32 array, plus the overall confidence"""
+    if not logprobs:
+        return np.empty(0, dtype=np.float32), 0.0
     
-    /* Input styling */
-    .stTextInput > div > div > input {
-        border-radius: 12px;
-        border: 1px solid #e5e5e7;
-        padding: 12px 16px;
-        font-size: 16px;
-        background: white;
-    }
+    # Each entry is already the chosen token's logprob, so exponentiate them in one pass
+    logprobs = np.asarray(logprobs, dtype=np.float64)
+    confidences = np.exp(logprobs) * 100.0
     
-    .stTextInput > div > div > input:focus {
-        border-color: #007aff;
-        box-shadow: 0 0 0 3px rgba(0, 122, 255, 0.1);
-    }
+    # Overall confidence is the geometric mean of the token probabilities: average in
+    # log space and exponentiate once, which stays accurate for very unlikely tokens
+    overall_confidence = float(np.exp(logprobs.mean()) * 100.0)
     
-    /* Button styling */
-    .stButton > button {
-        border-radius: 12px;
-        font-weight: 500;
-        padding: 8px 20px;
-        border: none;
-        background: linear-gradient(135deg, #007aff 0%, #0056cc 100%);
-        color: white;
-        transition: all 0.2s ease;
+    # float32 is plenty for display
+    return confidences.astype(np.float32), overall_confidence
+
+def iter_tokens_with_sentence(text):
+    """Yield (token, sentence_id) pairs from a single pass over the text (simplified tokenization)"""
+    # This is a simplified tokenization - in practice, you'd want to use the actual tokens
+    # For now, we split by whitespace and end a sentence after tokens ending in . ! or ?
+    sentence_id = 0
+    for match in _WORD_RE.finditer(text):
+        token = match.group()
+        yield token, sentence_id
+        if token[-1] in '.!?':
+            sentence_id += 1
+
+def group_token_confidences_by_sentence(response_text, token_logprobs):
+    sentence_tokens = defaultdict(list)
+
+    for token, sentence_id in iter_tokens_with_sentence(response_text):
+        sentence_tokens[sentence_id].append(token)
+
+    # Sentences are contiguous runs of tokens, so each token's sentence id follows from
+    # the sentence lengths without keeping a per-token list
+    sentence_count = len(sentence_tokens)
+    lengths = np.fromiter((len(tokens) for tokens in sentence_tokens.values()), dtype=np.int64, count=sentence_count)
+    token_logprobs = np.asarray(token_logprobs, dtype=np.float64)
+    ids = np.repeat(np.arange(sentence_count), lengths)[:len(token_logprobs)]
+
+    # Geometric mean per sentence, matching the overall confidence: a segmented mean of
+    # the token log probabilities, exponentiated once. Sentences without tokens get 0
+    counts = np.bincount(ids, minlength=sentence_count)
+    sums = np.bincount(ids, weights=token_logprobs[:len(ids)], minlength=sentence_count)
+    means = np.where(counts > 0, np.exp(sums / np.maximum(counts, 1)) * 100.0, 0.0)
+
+    return [(' '.join(tokens), avg_conf) for tokens, avg_conf in zip(sentence_tokens.values(), means.tolist())]
+
+def text_to_html(text):
+    """Escape text for an HTML block, keeping its line breaks"""
+    # A raw blank line would end the HTML block and leave the rest to the markdown parser
+    return html.escape(text).replace('\n', '<br>')
+
+def render_entry_html(entry):
+    """Build the question, confidence label and response HTML for a chat entry"""
+    return f"""
+    <p><strong>You:</strong> {entry['question_html']}</p>
+    """ + format_confidence_label(entry['overall_confidence']) + f"""
+    <p><strong>Bot:</strong></p>
+    <div class="response-text">
+        {entry['response_html']}
+    </div>
+    """
+
+def render_sentence_badges(entry):
+    """Build the combined confidence badge HTML for each sentence of a chat entry's response"""
+    parts = []
+    sentence_confidences = group_token_confidences_by_sentence(
+        entry['response'], entry['token_logprobs']
+    )
+
+    colors = get_confidence_colors([conf for _, conf in sentence_confidences])
+
+    for (sentence, conf), color in zip(sentence_confidences, colors.tolist()):
+        parts.append(
+            f'<div class="token-badge" style="--token-color: {color};">'
+            f'{html.escape(sentence)} <span class="badge-confidence">({conf:.1f}%)</span>'
+            '</div>'
+        )
+
+    return '<div class="badge-row">' + ''.join(parts) + '</div>'
+
+def create_chat_entry(question, response_text, token_logprobs, overall_confidence):
+    """Build a chat history entry from a finished response, rendering its HTML once"""
+    entry = {
+        'question': question,
+        'response': response_text,
+        # Escaped once here so the entry can be rendered as a single HTML block
+        'question_html': html.escape(question),
+        'response_html': text_to_html(response_text),
+        # Log probabilities rather than probabilities, which underflow to 0 in float32
+        # for very unlikely tokens; float32 keeps chat history in session state compact
+        'token_logprobs': np.asarray(token_logprobs, dtype=np.float32),
+        'overall_confidence': overall_confidence
     }
+    entry['rendered_html'] = render_entry_html(entry)
+    entry['sentences_html'] = render_sentence_badges(entry)
+    return entry
+
+def add_chat_entry(question, response_text, token_logprobs, overall_confidence):
+    """Add a finished response to the top of the chat history, dropping entries beyond MAX_HISTORY"""
+    history = st.session_state.chat_history
+    history.insert(0, create_chat_entry(question, response_text, token_logprobs, overall_confidence))
+    del history[MAX_HISTORY:]
+
+def queue_question():
+    """Move the current input into the pending questions queue"""
+    question = st.session_state.user_input
+    if question:
+        st.session_state.pending_questions.append(question)
+        st.session_state.user_input = ""
+
+def collect_batch_results():
+    """Poll submitted batch jobs and add the answers of finished ones to the chat history"""
+    remaining_jobs = []
     
-    .stButton > button:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 4px 12px rgba(0, 122, 255, 0.3);
-    }
+    for job in st.session_state.batch_jobs:
+        try:
+            job['status'], results, errors = poll_batch(job['id'])
+        except Exception as e:
+            st.error(f"Error checking batch {job['id']}: {str(e)}")
+            remaining_jobs.append(job)
+            continue
+        
+        if results is not None:
+            missing = []
+            for i, question in enumerate(job['questions']):
+                response_text, logprobs = results.get(i, (None, None))
+                token_confidences, overall_confidence = calculate_token_confidences(logprobs)
+                
+                if response_text and token_confidences.size:
+                    add_chat_entry(question, response_text, logprobs, overall_confidence)
+                else:
+                    missing.append(f"- {question}: {errors.get(i, 'no answer returned')}")
+            
+            if missing:
+                st.error(
+                    f"Batch {job['id']} returned no answer for {len(missing)} of {len(job['questions'])} questions:\n\n"
+                    + "\n".join(missing)
+                )
+        elif job['status'] in ("failed", "expired", "cancelled"):
+            st.error(f"Batch {job['id']} {job['status']} before completing")
+        else:
+            remaining_jobs.append(job)
     
-    /* Confidence label styling */
-    .confidence-label {
-        background: #f5f5f7;
-        border: 1px solid var(--confidence-color);
-        color: var(--confidence-color);
-        padding: 8px 16px;
-        border-radius: 20px;
-        display: inline-block;
-        font-weight: 600;
-        font-size: 14px;
+    st.session_state.batch_jobs = remaining_jobs
+
+# Static page content, built once at import instead of inside main()
+_CSS = """
+<style>
+/* Apple-inspired design system */
+.main {
+    background-color: #fafafa;
+}
+
+.stApp {
+    background-color: #fafafa;
+}
+
+/* Custom title styling */
+.main-title {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    font-size: 2.5rem;
+    font-weight: 600;
+    color: #1d1d1f;
+    text-align: center;
+    margin-bottom: 0.5rem;
+    letter-spacing: -0.02em;
+}
+
+.main-subtitle {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    font-size: 1.1rem;
+    color: #86868b;
+    text-align: center;
+    margin-bottom: 2rem;
+    font-weight: 400;
+}
+
+/* Card-like containers */
+.chat-container {
+    background: white;
+    border-radius: 16px;
+    padding: 24px;
+    margin: 16px 0;
+    box-shadow: 0 2px 8px rgba(0, 0, 0, 0.04);
+    border: 1px solid #e5e5e7;
+}
+
+/* Input styling */
+.stTextInput > div > div > input {
+    border-radius: 12px;
+    border: 1px solid #e5e5e7;
+    padding: 12px 16px;
+    font-size: 16px;
+    background: white;
+}
+
+.stTextInput > div > div > input:focus {
+    border-color: #007aff;
+    box-shadow: 0 0 0 3px rgba(0, 122, 255, 0.1);
+}
+
+/* Button styling */
+.stButton > button {
+    border-radius: 12px;
+    font-weight: 500;
+    padding: 8px 20px;
+    border: none;
+    background: linear-gradient(135deg, #007aff 0%, #0056cc 100%);
+    color: white;
+    transition: all 0.2s ease;
+}
+
+.stButton > button:hover {
+    transform: translateY(-1px);
+    box-shadow: 0 4px 12px rgba(0, 122, 255, 0.3);
+}
+
+/* Confidence label styling */
+.confidence-label {
+    background: #f5f5f7;
+    border: 1px solid var(--confidence-color);
+    color: var(--confidence-color);
+    padding: 8px 16px;
+    border-radius: 20px;
+    display: inline-block;
+    font-weight: 600;
+    font-size: 14px;
+    margin: 8px 0;
+}
+
+/* Token confidence badges */
+.token-badge {
+    background: #f5f5f7;
+    padding: 6px 12px;
+    border-radius: 16px;
+    display: inline-block;
+    margin: 4px;
+    font-size: 13px;
+    font-weight: 500;
+    border: 1px solid var(--token-color);
+    color: var(--token-color);
+}
+
+/* Flex row holding all of an entry's badges */
+.badge-row {
+    display: flex;
+    flex-wrap: wrap;
+    align-items: flex-start;
+}
+
+.badge-confidence {
+    font-size: 12px;
+}
+
+/* Sidebar styling */
+.css-1d391kg {
+    background-color: #f5f5f7;
+}
+
+/* Headers */
+h1, h2, h3 {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    color: #1d1d1f;
+    font-weight: 600;
+}
+
+/* Text styling */
+p, div {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+}
+
+/* Expander styling */
+.streamlit-expanderHeader {
+    background: white;
+    border-radius: 12px;
+    border: 1px solid #e5e5e7;
+    font-weight: 500;
+}
+
+/* Response text styling */
+.response-text {
+    background: #f5f5f7;
+    padding: 16px;
+    border-radius: 12px;
+    border-left: 4px solid #007aff;
+    margin: 12px 0;
+    font-size: 16px;
+    line-height: 1.5;
+}
+</style>
+"""
+
+@st.cache_resource(show_spinner=False)
+def _css():
+    """Return the stylesheet with comments stripped and whitespace collapsed"""
+    # The script re-executes on every rerun, so minify once per process rather than per run;
+    # the result is still injected on every run since Streamlit clears elements that aren't re-sent
+    return " ".join(re.sub(r'/\*.*?\*/', '', _CSS).split())
+
+_API_KEY_WARNING_HTML = """
+<div style="
+    background: #fff3cd;
+    border: 1px solid #ffeaa7;
+    color: #856404;
+    padding: 16px;
+    border-radius: 12px;
+    margin: 24px 0;
+">
+    <h4 style="margin: 0 0 12px 0; color: #856404;">⚠️ OpenAI API Key Not Configured</h4>
+    <p style="margin: 0 0 8px 0;">For local development, create a <code>.env</code> file with:</p>
+    <pre style="
+        background: #f8f9fa;
+        padding: 12px;
+        border-radius: 8px;
         margin: 8px 0;
-    }
+        font-size: 14px;
+    ">OPENAI_API_KEY=your_api_key_here</pre>
+    <p style="margin: 8px 0 0 0;">For Streamlit Cloud deployment, add your API key in the app settings.</p>
+</div>
+"""
 
-    /* Token confidence badges */
-    .token-badge {
-        background: #f5f5f7;
-        padding: 6px 12px;
-        border-radius: 16px;
-        display: inline-block;
-        margin: 4px;
-        font-size: 13px;
-        font-weight: 500;
-        border: 1px solid var(--token-color);
-        color: var(--token-color);
-    }
-    
-    /* Sidebar styling */
-    .css-1d391kg {
-        background-color: #f5f5f7;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-        color: #1d1d1f;
-        font-weight: 600;
-    }
-    
-    /* Text styling */
-    p, div {
-        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-    }
-    
-    /* Expander styling */
-    .streamlit-expanderHeader {
-        background: white;
-        border-radius: 12px;
-        border: 1px solid #e5e5e7;
-        font-weight: 500;
-    }
+_GETTING_STARTED_HTML = """
+<div style="
+    background: white;
+    padding: 32px;
+    border-radius: 16px;
+    margin: 32px 0;
+    box-shadow: 0 2px 8px rgba(0, 0, 0, 0.04);
+    border: 1px solid #e5e5e7;
+">
+    <h3 style="color: #1d1d1f; margin-top: 0;">💡 Getting Started</h3>
+    <div style="color: #86868b; line-height: 1.6; margin-bottom: 24px;">
+        1. <strong>API key is configured</strong> ✅<br>
+        2. <strong>Type a question</strong> in the input field above<br>
+        3. <strong>Click Send</strong> to get a response with confidence analysis<br>
+        4. <strong>Click "View Token-Level Confidences"</strong> to see individual token confidence scores<br>
+        5. <strong>Overall confidence</strong> is shown with a colored label
+    </div>
+</div>
+"""
+
+def main():
+    st.set_page_config(
+        page_title="Interpretable Chatbot",
+        page_icon="🤖",
+        layout="wide"
+    )
     
-    /* Response text styling */
-    .response-text {
-        background: #f5f5f7;
-        padding: 16px;
-        border-radius: 12px;
-        border-left: 4px solid #007aff;
-        margin: 12px 0;
-        font-size: 16px;
-        line-height: 1.5;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Apply Apple-inspired custom CSS
+    st.markdown(_css(), unsafe_allow_html=True)
     
     # Apple-inspired title
-    st.markdown('<h1 class="main-title">Interpretable Chatbot</h1>', unsafe_allow_html=True)
-    st.markdown('<p class="main-subtitle">Ask a question and see the model\'s confidence for each token in its response</p>', unsafe_allow_html=True)
+    st.markdown(
+        '<h1 class="main-title">Interpretable Chatbot</h1>'
+        '<p class="main-subtitle">Ask a question and see the model\'s confidence for each token in its response</p>',
+        unsafe_allow_html=True
+    )
     
     # Check if API key is configured
-    if not client:
-        st.markdown("""
-        <div style="
-            background: #fff3cd;
-            border: 1px solid #ffeaa7;
-            color: #856404;
-            padding: 16px;
-            border-radius: 12px;
-            margin: 24px 0;
-        ">
-            <h4 style="margin: 0 0 12px 0; color: #856404;">⚠️ OpenAI API Key Not Configured</h4>
-            <p style="margin: 0 0 8px 0;">For local development, create a <code>.env</code> file with:</p>
-            <pre style="
-                background: #f8f9fa;
-                padding: 12px;
-                border-radius: 8px;
-                margin: 8px 0;
-                font-size: 14px;
-            ">OPENAI_API_KEY=your_api_key_here</pre>
-            <p style="margin: 8px 0 0 0;">For Streamlit Cloud deployment, add your API key in the app settings.</p>
-        </div>
-        """, unsafe_allow_html=True)
+    if not get_openai_client():
+        st.markdown(_API_KEY_WARNING_HTML, unsafe_allow_html=True)
         return
     
     # Initialize session state
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
+    if 'pending_questions' not in st.session_state:
+        st.session_state.pending_questions = []
+    if 'batch_jobs' not in st.session_state:
+        st.session_state.batch_jobs = []
     
     # Main chat interface
     st.markdown("## 💬 Chat Interface")
 
     with st.container():
-        user_question = st.text_input(
-            placeholder="e.g., What is the capital of France?",
-            key="user_input",
-            label = ""
+        # Typing inside a form doesn't rerun the script; only the submit buttons do
+        with st.form("ask", clear_on_submit=False):
+            user_question = st.text_input(
+                placeholder="e.g., What is the capital of France?",
+                key="user_input",
+                label = ""
 
-        )
+            )
 
-        col1, col2 = st.columns([1, 4])
-        with col1:
-            submit_button = st.button("Send", type="primary")
-        with col2:
-            if st.button("Clear Chat", type="secondary"):
-                st.session_state.chat_history = []
-                st.rerun()
+            col1, col2 = st.columns([1, 4])
+            with col1:
+                submit_button = st.form_submit_button("Send", type="primary")
+            with col2:
+                st.form_submit_button("Add to Queue", type="secondary", on_click=queue_question)
         
-    # Process user input
-    if submit_button and user_question:
-        with st.spinner("🤔 Thinking..."):
-            response_text, logprobs = get_chatbot_response(user_question)
+        if st.button("Clear Chat", type="secondary"):
+            st.session_state.chat_history = []
+            st.session_state.pending_questions = []
+            st.rerun()
+        
+        deterministic_mode = st.checkbox(
+            "Deterministic mode",
+            help="Answer with temperature 0; a question sent on its own is served from cache when asked again, questions sent together with the queue always call the API"
+        )
+        
+        if st.session_state.pending_questions:
+            queued_html = ''.join(f"<li>{html.escape(question)}</li>" for question in st.session_state.pending_questions)
+            st.markdown(
+                f"<p><strong>Queued questions ({len(st.session_state.pending_questions)}):</strong> sent together with the next question</p>"
+                f"<ul>{queued_html}</ul>",
+                unsafe_allow_html=True
+            )
             
-            if response_text and logprobs:
-                # Calculate confidences
-                token_confidences, overall_confidence = calculate_token_confidences(response_text, logprobs)
-                
-                # Split response into tokens
-                tokens = split_response_into_tokens(response_text)
-                
-                # Create chat entry
-                chat_entry = {
-                    'question': user_question,
-                    'response': response_text,
-                    'tokens': tokens,
-                    'token_confidences': token_confidences,
-                    'overall_confidence': overall_confidence
-                }
+            if st.button("Submit Queue as Batch Job", help="Answer the queued questions through OpenAI's Batch API at half the cost; results can take up to 24 hours"):
+                batch_id = submit_batch(
+                    st.session_state.pending_questions,
+                    temperature=0.0 if deterministic_mode else TEMPERATURE
+                )
+                if batch_id:
+                    st.session_state.batch_jobs.append({
+                        'id': batch_id,
+                        'questions': st.session_state.pending_questions,
+                        'status': "submitted"
+                    })
+                    st.session_state.pending_questions = []
+                    st.rerun()
+        
+        if st.session_state.batch_jobs:
+            if st.button("Check Batch Jobs"):
+                collect_batch_results()
+            
+            for job in st.session_state.batch_jobs:
+                st.markdown(f"- Batch `{job['id']}`: {len(job['questions'])} questions, {job['status']}")
+        
+    # Process user input: any queued questions are sent along with the current one
+    questions = []
+    if submit_button:
+        questions = st.session_state.pending_questions + ([user_question] if user_question else [])
+        st.session_state.pending_questions = []
+    
+    if len(questions) > 1:
+        with st.spinner(f"🤔 Thinking about {len(questions)} questions..."):
+            responses = get_chatbot_responses(questions, temperature=0.0 if deterministic_mode else TEMPERATURE)
+        
+        failed = []
+        for question, response in zip(questions, responses):
+            if isinstance(response, Exception):
+                failed.append((question, response))
+                continue
+            
+            response_text, logprobs = response
+            token_confidences, overall_confidence = calculate_token_confidences(logprobs)
+            
+            if response_text and token_confidences.size:
+                add_chat_entry(question, response_text, logprobs, overall_confidence)
+        
+        # Failed questions go back into the queue so they can be sent again
+        if failed:
+            st.session_state.pending_questions.extend(question for question, _ in failed)
+            st.error(
+                f"Error calling OpenAI API for {len(failed)} of {len(questions)} questions; they are back in the queue:\n\n"
+                + "\n".join(f"- {question}: {str(e)}" for question, e in failed)
+            )
+    elif questions and deterministic_mode:
+        question = questions[0]
+        with st.spinner("🤔 Thinking..."):
+            response_text, logprobs = get_cached_chatbot_response(question)
+        
+        if response_text and logprobs:
+            token_confidences, overall_confidence = calculate_token_confidences(logprobs)
+            add_chat_entry(question, response_text, logprobs, overall_confidence)
+    elif questions:
+        question = questions[0]
+        placeholder = st.empty()
+        response_text = ""
+        logprobs = []
+        
+        try:
+            for i, (text, chunk_logprobs) in enumerate(stream_chatbot_response(question)):
+                response_text += text
+                logprobs.extend(chunk_logprobs)
                 
-                st.session_state.chat_history.append(chat_entry)
+                if i % STREAM_RENDER_INTERVAL == 0:
+                    placeholder.markdown(f"""
+                    <div class="response-text">
+                        {text_to_html(response_text.strip())}
+                    </div>
+                    """, unsafe_allow_html=True)
+        except Exception as e:
+            # A partial answer isn't saved; the question goes back into the queue like failed fan-out requests
+            placeholder.empty()
+            st.session_state.pending_questions.append(question)
+            st.error(f"Error calling OpenAI API: {str(e)}; the question is back in the queue")
+        else:
+            # The finished response is rendered from the chat history below
+            placeholder.empty()
+            response_text = response_text.strip()
+            token_confidences, overall_confidence = calculate_token_confidences(logprobs)
+            
+            if response_text and token_confidences.size:
+                add_chat_entry(question, response_text, logprobs, overall_confidence)
     
     # Display chat history
     if st.session_state.chat_history:
         st.markdown("## 📝 Chat History")
 
-        for entry in reversed(st.session_state.chat_history):
-            with st.container():
-                # User message
-                st.markdown(f"**You:** {entry['question']}")
-
-                # Confidence label
-                confidence_html = format_confidence_label(entry['overall_confidence'])
-                st.markdown(confidence_html, unsafe_allow_html=True)
-
-                # Bot response
-                st.markdown(f"**Bot:**")
-                st.markdown(f"""
-                <div class="response-text">
-                    {entry['response']}
-                </div>
-                """, unsafe_allow_html=True)
-
-                # Token-level confidences
-                with st.expander("🔍 View Sentence-Level Confidences", expanded=False):
-                    sentence_confidences = group_token_confidences_by_sentence(
-                        entry['response'], entry['tokens'], entry['token_confidences']
-                    )
-
-                    for sentence, conf in sentence_confidences:
-                        if conf >= 90:
-                            color = "#34c759"
-                        elif conf >= 75:
-                            color = "#ff9500"
-                        elif conf >= 60:
-                            color = "#ff3b30"
-                        else:
-                            color = "#ff2d92"
-
-                        st.markdown(f"""
-                        <div class="token-badge" style="--token-color: {color}; color: {color}; background: #f5f5f7; border: 1px solid {color};">
-                            {sentence.strip()} <span style='font-size: 12px;'>({conf:.1f}%)</span>
-                        </div>
-                        """, unsafe_allow_html=True)
+        # History is kept newest first, with each entry's HTML rendered when it was added
+        for entry in st.session_state.chat_history:
+            # User message, confidence label and bot response in a single payload
+            st.markdown(entry['rendered_html'], unsafe_allow_html=True)
+
+            # Sentence-level confidences
+            with st.expander("🔍 View Sentence-Level Confidences", expanded=False):
+                st.markdown(entry['sentences_html'], unsafe_allow_html=True)
 
     # Instructions
     if not st.session_state.chat_history:
-        st.markdown("""
-        <div style="
-            background: white;
-            padding: 32px;
-            border-radius: 16px;
-            margin: 32px 0;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.04);
-            border: 1px solid #e5e5e7;
-        ">
-            <h3 style="color: #1d1d1f; margin-top: 0;">💡 Getting Started</h3>
-            <div style="color: #86868b; line-height: 1.6; margin-bottom: 24px;">
-                1. <strong>API key is configured</strong> ✅<br>
-                2. <strong>Type a question</strong> in the input field above<br>
-                3. <strong>Click Send</strong> to get a response with confidence analysis<br>
-                4. <strong>Click "View Token-Level Confidences"</strong> to see individual token confidence scores<br>
-                5. <strong>Overall confidence</strong> is shown with a colored label
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_GETTING_STARTED_HTML, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file